@@ -1,16 +1,51 @@
+import asyncio
+import functools
 import logging
 import httpx
+import orjson
 import pydantic
 import stamina
 
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from typing import List, Union
+from app import settings
 from app.services.state import IntegrationStateManager
+from app.services.utils import LoopLocal
 
 
 logger = logging.getLogger(__name__)
 state_manager = IntegrationStateManager()
 
+# One pooled client per event loop, so connections are reused across calls
+# without ever handing a client bound to a closed loop to a new worker loop.
+# HTTP/2 lets concurrent station requests multiplex over a single connection.
+_clients = LoopLocal()
+
+
+async def get_client() -> httpx.AsyncClient:
+    session = _clients.get()
+    if session is None or session.is_closed:
+        session = httpx.AsyncClient(
+            timeout=120,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=30),
+            http2=True
+        )
+        _clients.set(session)
+    return session
+
+
+async def aclose_client():
+    session = _clients.pop()
+    if session is not None:
+        await session.aclose()
+
+
+def _ensure_utc(cls, v):
+    # Shared by every timestamp field: the API may send naive timestamps, which are UTC
+    if not v.tzinfo:
+        return v.replace(tzinfo=timezone.utc)
+    return v
+
 
 class Station(pydantic.BaseModel):
     Station_ID: int
@@ -26,11 +61,7 @@ class StationsResponse(pydantic.BaseModel):
     code: int
     message: str
 
-    @pydantic.validator('generated_at', always=True)
-    def parse_time_string(cls, v):
-        if not v.tzinfo:
-            return v.replace(tzinfo=timezone.utc)
-        return v
+    _generated_at_utc = pydantic.validator('generated_at', allow_reuse=True)(_ensure_utc)
 
 
 class ConditionsItem(pydantic.BaseModel):
@@ -47,11 +78,7 @@ class ConditionsItem(pydantic.BaseModel):
     FDI: int
     solar_radiation: float
 
-    @pydantic.validator('ts', always=True)
-    def parse_time_string(cls, v):
-        if not v.tzinfo:
-            return v.replace(tzinfo=timezone.utc)
-        return v
+    _ts_utc = pydantic.validator('ts', allow_reuse=True)(_ensure_utc)
 
 
 class Units(pydantic.BaseModel):
@@ -90,11 +117,7 @@ class ConditionsResponse(pydantic.BaseModel):
     code: int
     message: str
 
-    @pydantic.validator('generated_at', always=True)
-    def parse_time_string(cls, v):
-        if not v.tzinfo:
-            return v.replace(tzinfo=timezone.utc)
-        return v
+    _generated_at_utc = pydantic.validator('generated_at', allow_reuse=True)(_ensure_utc)
 
     class Config:
         allow_population_by_field_name = True
@@ -125,11 +148,7 @@ class DailySummaryResponse(pydantic.BaseModel):
     code: int
     message: str
 
-    @pydantic.validator('generated_at', always=True)
-    def parse_time_string(cls, v):
-        if not v.tzinfo:
-            return v.replace(tzinfo=timezone.utc)
-        return v
+    _generated_at_utc = pydantic.validator('generated_at', allow_reuse=True)(_ensure_utc)
 
     class Config:
         allow_population_by_field_name = True
@@ -159,102 +178,170 @@ class VWUnauthorizedException(Exception):
         super().__init__(f"'{self.status_code}: {self.message}, Error: {self.error}'")
 
 
-@stamina.retry(on=httpx.HTTPError, wait_initial=4.0, wait_jitter=5.0, wait_max=32.0)
-async def get_stations(integration, base_url, auth):
-    async with httpx.AsyncClient(timeout=120) as session:
-        logger.info(f"-- Getting stations for integration ID: {integration.id} --")
-
-        url = f"{base_url}/stations.php"
-
-        try:
-            response = await session.get(url, params={"key": auth.key.get_secret_value()})
-            if response.is_error:
-                logger.error(f"Error 'get_stations'. Response body: {response.text}")
-            response.raise_for_status()
-            parsed_response = response.json()
-            if parsed_response:
-                if parsed_response["code"] != 200:
-                    raise VWException(
-                        error=Exception(parsed_response["message"]),
-                        message=parsed_response["message"],
-                        status_code=parsed_response["code"]
-                    )
-                return StationsResponse.parse_obj(parsed_response)
-            else:
-                return response.text
-        except httpx.HTTPStatusError as e:
-            if e.response.status_code == 401:
-                raise VWUnauthorizedException(e, "Unauthorized access")
-            elif e.response.status_code == 404:
-                raise VWNotFoundException(e, "User not found")
-            raise e
+def _parse_response(response, model):
+    # Decode the raw bytes once with orjson and validate that same dict into the response model
+    parsed_response = orjson.loads(response.content)
+    if not parsed_response:
+        return response.text
+    if parsed_response["code"] != 200:
+        raise VWException(
+            error=Exception(parsed_response["message"]),
+            message=parsed_response["message"],
+            status_code=parsed_response["code"]
+        )
+    return model.parse_obj(parsed_response)
+
+
+def _conditional_headers(validators):
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+async def _save_validators(integration_id, action_id, response, source_id="no-source", keep_body=True):
+    # Keep the body next to its validators (if asked to) so a 304 can be answered without a new download
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if etag or last_modified:
+        state = {"etag": etag, "last_modified": last_modified}
+        if keep_body:
+            state["body"] = response.text
+        await state_manager.set_state(integration_id, action_id, state, source_id=source_id)
+
+
+@functools.lru_cache(maxsize=1024)
+def _endpoint_url(base_url: str, path: str) -> httpx.URL:
+    # httpx.URL is immutable, so each endpoint is parsed once and shared by every request to it
+    return httpx.URL(f"{base_url}/{path}")
+
+
+async def _get(session, url, params, operation, headers=None):
+    # Only the request itself is retried; URL, params, secrets and stored validators are prepared once by the caller
+    async for attempt in stamina.retry_context(on=httpx.HTTPError, wait_initial=4.0, wait_jitter=5.0, wait_max=32.0):
+        with attempt:
+            try:
+                response = await session.get(url, params=params, headers=headers)
+                if response.status_code == httpx.codes.NOT_MODIFIED:
+                    return response
+                if response.is_error:
+                    logger.error(f"Error '{operation}'. Response body: {response.text}")
+                response.raise_for_status()
+                return response
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code == 401:
+                    raise VWUnauthorizedException(e, "Unauthorized access")
+                elif e.response.status_code == 404:
+                    raise VWNotFoundException(e, "User not found")
+                raise e
+
+
+async def get_stations(integration, base_url, auth, conditional=True):
+    session = await get_client()
+    logger.info(f"-- Getting stations for integration ID: {integration.id} --")
+
+    url = _endpoint_url(base_url, "stations.php")
+    params = {
+        "key": auth.key.get_secret_value(),
+    }
+    integration_id = str(integration.id)
+    # One set of validators per (integration, base URL), like the stations cache
+    validators = await state_manager.get_state(integration_id, "stations_etag", base_url) if conditional else {}
+
+    response = await _get(session, url, params, "get_stations", headers=_conditional_headers(validators))
+    if response.status_code == httpx.codes.NOT_MODIFIED:
+        if validators.get("body"):
+            return StationsResponse.parse_obj(orjson.loads(validators["body"]))
+        # Nothing stored to answer the 304 with, so download the list again
+        response = await _get(session, url, params, "get_stations")
+    stations = _parse_response(response, StationsResponse)
+    if conditional and isinstance(stations, StationsResponse):
+        await _save_validators(integration_id, "stations_etag", response, source_id=base_url)
+    return stations
 
 
-@stamina.retry(on=httpx.HTTPError, wait_initial=4.0, wait_jitter=5.0, wait_max=32.0)
 async def get_station_conditions(integration, base_url, config, auth):
-    async with httpx.AsyncClient(timeout=120) as session:
-        url = f"{base_url}/conditions.php/{config.station.Station_ID}"
-        params = {
-            "key": auth.key.get_secret_value(),
-        }
-
-        logger.info(f"-- Getting latest conditions for integration ID: {integration.id} Station ID: {config.station.Station_ID} --")
-
-        try:
-            response = await session.get(url, params=params)
-            if response.is_error:
-                logger.error(f"Error 'get_station_conditions'. Response body: {response.text}")
-            response.raise_for_status()
-            parsed_response = response.json()
-            if parsed_response:
-                if parsed_response["code"] != 200:
-                    raise VWException(
-                        error=Exception(parsed_response["message"]),
-                        message=parsed_response["message"],
-                        status_code=parsed_response["code"]
-                    )
-                obs = ConditionsResponse.parse_obj(parsed_response)
-                return obs
-            else:
-                return response.text
-        except httpx.HTTPStatusError as e:
-            if e.response.status_code == 401:
-                raise VWUnauthorizedException(e, "Unauthorized access")
-            elif e.response.status_code == 404:
-                raise VWNotFoundException(e, "User not found")
-            raise e
-
-
-@stamina.retry(on=httpx.HTTPError, wait_initial=4.0, wait_jitter=5.0, wait_max=32.0)
-async def get_daily_summary(integration, base_url, station, config):
-    async with httpx.AsyncClient(timeout=120) as session:
-        url = f"{base_url}/dailysummary.php/{station.Station_ID}"
-        params = {
-            "key": config.key.get_secret_value(),
-        }
-
-        logger.info(f"-- Getting daily summary for integration ID: {integration.id} Station: {station.Station_ID} --")
-
-        try:
-            response = await session.get(url, params=params)
-            if response.is_error:
-                logger.error(f"Error 'get_daily_summary'. Response body: {response.text}")
-            response.raise_for_status()
-            parsed_response = response.json()
-            if parsed_response:
-                if parsed_response["code"] != 200:
-                    raise VWException(
-                        error=Exception(parsed_response["message"]),
-                        message=parsed_response["message"],
-                        status_code=parsed_response["code"]
-                    )
-                summary = DailySummaryResponse.parse_obj(parsed_response)
-                return summary
-            else:
-                return response.text
-        except httpx.HTTPStatusError as e:
-            if e.response.status_code == 401:
-                raise VWUnauthorizedException(e, "Unauthorized access")
-            elif e.response.status_code == 404:
-                raise VWNotFoundException(e, "User not found")
+    session = await get_client()
+    url = _endpoint_url(base_url, f"conditions.php/{config.station.Station_ID}")
+    params = {
+        "key": auth.key.get_secret_value(),
+    }
+
+    logger.info(f"-- Getting latest conditions for integration ID: {integration.id} Station ID: {config.station.Station_ID} --")
+
+    response = await _get(session, url, params, "get_station_conditions")
+    return _parse_response(response, ConditionsResponse)
+
+
+async def get_daily_summary(integration, base_url, station, config, validators=None):
+    session = await get_client()
+    url = _endpoint_url(base_url, f"dailysummary.php/{station.Station_ID}")
+    params = {
+        "key": config.key.get_secret_value(),
+    }
+
+    integration_id = str(integration.id)
+    source_id = str(station.Station_ID)
+    if validators is None:
+        validators = await state_manager.get_state(integration_id, "daily_summary_etag", source_id)
+
+    logger.info(f"-- Getting daily summary for integration ID: {integration.id} Station: {station.Station_ID} --")
+
+    response = await _get(session, url, params, "get_daily_summary", headers=_conditional_headers(validators))
+    if response.status_code == httpx.codes.NOT_MODIFIED:
+        # These summaries were already sent the last time they were downloaded
+        logger.info(f"-- Daily summary of station {station.Station_ID} not modified since last pull --")
+        return None
+    summary = _parse_response(response, DailySummaryResponse)
+    if isinstance(summary, DailySummaryResponse):
+        await _save_validators(integration_id, "daily_summary_etag", response, source_id=source_id, keep_body=False)
+    return summary
+
+
+async def forget_daily_summary_validators(integration, station):
+    # Used when the summaries couldn't be sent, so the next pull downloads them again instead of getting a 304
+    await state_manager.delete_state(str(integration.id), "daily_summary_etag", str(station.Station_ID))
+
+
+async def get_daily_summary_validators(integration, stations):
+    # One MGET for every station's conditional GET validators, ready to pass to get_daily_summary
+    return await state_manager.get_states_bulk(
+        str(integration.id),
+        "daily_summary_etag",
+        [str(station.Station_ID) for station in stations]
+    )
+
+
+async def get_stations_cached(integration, base_url, auth):
+    # Station metadata changes on the order of days, so scheduled pulls reuse the last list for a while
+    integration_id = str(integration.id)
+    cached = await state_manager.get_state(integration_id, "stations_cache")
+    if cached and cached.get("base_url") == base_url:
+        fetched_at = datetime.fromisoformat(cached["fetched_at"])
+        if datetime.now(timezone.utc) - fetched_at < timedelta(seconds=settings.STATIONS_CACHE_TTL):
+            return StationsResponse.parse_obj(cached["stations"])
+    else:
+        cached = None
+
+    try:
+        response = await get_stations(integration, base_url, auth)
+    except httpx.HTTPError as e:
+        if not cached:
             raise e
+        # Keep the pull pipeline running with the last known stations during upstream outages
+        logger.warning(f"Error getting stations for integration ID: {integration_id}, using cached stations from {cached['fetched_at']}. Error: {e}")
+        return StationsResponse.parse_obj(cached["stations"])
+
+    if isinstance(response, StationsResponse):
+        await state_manager.set_state(
+            integration_id,
+            "stations_cache",
+            {
+                "base_url": base_url,
+                "fetched_at": datetime.now(timezone.utc).isoformat(),
+                "stations": response.dict()
+            }
+        )
+    return response
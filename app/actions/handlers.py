@@ -1,9 +1,12 @@
+import asyncio
 import httpx
 import logging
 import datetime
 
 import app.actions.client as client
 
+from app import settings
+
 from app.actions.configurations import (
     AuthenticateConfig,
     PullObservationsConfig,
@@ -22,66 +25,96 @@ state_manager = IntegrationStateManager()
 
 
 VW_BASE_URL = "https://www.vitalweather.co.za/api/v1"
+MAX_CONCURRENT_TRIGGERS = 16
+MAX_CONCURRENT_SUMMARY_REQUESTS = 8  # Keep the fan-out polite to the Vital Weather API
+MAX_CONCURRENT_SENDS = 4
 
 
-def transform_daily_summary(summary, units, station):
-    def match_units(conditions, units):
-        for key, value in conditions.items():
-            if key in units and key != "ts":
-                conditions[key] = f"{value} {units[key]}"
-        return conditions
+def transform_daily_summary(summary, units, station, unit_suffixes=None, location=None):
+    if unit_suffixes is None:
+        unit_suffixes = _unit_suffixes(units.__dict__, client.DailySummaryItem.__fields__)
+    if location is None:
+        location = {
+            "lat": station.latitude,
+            "lon": station.longitude
+        }
 
-    readings = match_units(summary.dict(), units.dict())
+    # A shallow copy of the validated fields is enough (no nested models), unlike the recursive .dict()
+    readings = dict(summary.__dict__)
+    for key, suffix in unit_suffixes:
+        readings[key] = f"{readings[key]}{suffix}"
 
     yield dict(
         title=f"Station {summary.station_id} Summary ({summary.Date})",
         event_type="weather_station_summary",
-        recorded_at=datetime.datetime.strptime(summary.Date, "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc),
-        location={
-            "lat": station.latitude,
-            "lon": station.longitude
-        },
-        event_details={**readings}
+        recorded_at=datetime.datetime.fromisoformat(summary.Date).replace(tzinfo=datetime.timezone.utc),
+        location=location,
+        event_details=readings
     )
 
 
-def transform(station, observations):
-    def match_units(conditions, units):
-        for record in conditions:
-            for key, value in record.items():
-                if key in units and key != "ts":
-                    record[key] = f"{value} {units[key]}"
-        return conditions
+def _transform_daily_summaries(daily_summary, station):
+    # The units and the station location are the same for every summary in the response, so they are built once.
+    # The location dict is shared by reference; the Gundi client only serializes it.
+    unit_suffixes = _unit_suffixes(daily_summary.units.__dict__, client.DailySummaryItem.__fields__)
+    location = {
+        "lat": station.latitude,
+        "lon": station.longitude
+    }
+    for station_summary in daily_summary.dailysummary:
+        logger.info("Sending daily summary for station %s Date: %s.", station_summary.station_id, station_summary.Date)
+        yield from transform_daily_summary(station_summary, daily_summary.units, station, unit_suffixes, location)
+
+
+def _unit_suffixes(units, fields):
+    # Build the unit suffixes once per response instead of once per record field. Records are validated models,
+    # so every field they carry is known up front and units without a matching field are dropped here rather
+    # than checked for on each record.
+    return [(key, f" {unit}") for key, unit in units.items() if key != "ts" and key in fields]
 
-    readings = match_units([h.dict() for h in observations.conditions], observations.units.dict())
 
-    for reading in readings:
+def transform(station, observations):
+    suffixes = _unit_suffixes(observations.units.__dict__, client.ConditionsItem.__fields__)
+
+    # Fields identical for every reading of the station are built once; the location dict is shared, not copied
+    base = {
+        "source_name": station.Station_Name,
+        "source": station.Station_ID,
+        "type": "stationary-object",
+        "subtype": "weather_station",
+    }
+    location = {
+        "lat": station.latitude,
+        "lon": station.longitude
+    }
+    station_height = station.height
+
+    for condition in observations.conditions:
+        # Read the validated fields straight from the model instead of deep-copying them via .dict()
+        additional = {"station_height": station_height, **condition.__dict__}
+        # Same text the Gundi client would produce with json.dumps(default=str), without its per-record fallback call
+        recorded_at = additional.pop("ts").isoformat(sep=" ")
+        for key, suffix in suffixes:
+            additional[key] = f"{additional[key]}{suffix}"
+
         yield {
-            "source_name": station.Station_Name,
-            "source": station.Station_ID,
-            "type": "stationary-object",
-            "subtype": "weather_station",
-            "recorded_at": reading.pop("ts"),
-            "location": {
-                "lat": station.latitude,
-                "lon": station.longitude
-            },
-            "additional": {
-                "station_height": station.height,
-                **reading
-            }
+            **base,
+            "recorded_at": recorded_at,
+            "location": location,
+            "additional": additional
         }
 
 
 async def action_auth(integration, action_config: AuthenticateConfig):
-    logger.info(f"Executing 'auth' action with integration ID {integration.id} and action_config {action_config}...")
+    logger.info("Executing 'auth' action with integration ID %s and action_config %s...", integration.id, action_config)
 
     base_url = integration.base_url or VW_BASE_URL
 
     try:
-        response = await client.get_stations(integration, base_url, action_config)
+        # Checking credentials must not depend on (or be answered from) stored conditional GET state
+        response = await client.get_stations(integration, base_url, action_config, conditional=False)
         if not response:
-            logger.error(f"Failed to authenticate with integration {integration.id} using {action_config}")
+            logger.error("Failed to authenticate with integration %s using %s", integration.id, action_config)
             return {"valid_credentials": False, "message": "Bad credentials"}
         return {"valid_credentials": True}
     except (client.VWUnauthorizedException, client.VWNotFoundException, client.VWException) as e:
@@ -90,77 +123,144 @@ async def action_auth(integration, action_config: AuthenticateConfig):
         return {"error": True, "status_code": e.response.status_code}
 
 
+async def _trigger_pull_station_conditions(integration, station, semaphore):
+    async with semaphore:
+        logger.info("Triggering 'action_pull_station_conditions' action for station %s to extract observations...", station.Station_ID)
+
+        parsed_config = PullStationConditionsConfig(
+            station=station
+        )
+        await trigger_action(integration.id, "pull_station_conditions", config=parsed_config)
+
+
 @activity_logger()
 async def action_pull_observations(integration, action_config: PullObservationsConfig):
-    logger.info(f"Executing 'pull_observations' action with integration ID {integration.id} and action_config {action_config}...")
+    logger.info("Executing 'pull_observations' action with integration ID %s and action_config %s...", integration.id, action_config)
 
     base_url = integration.base_url or VW_BASE_URL
     auth_config = get_auth_config(integration)
 
     try:
-        response = await client.get_stations(integration, base_url, auth_config)
-        if response:
-            logger.info(f"Found {len(response.stations)} stations for integration {integration.id}")
+        response = await client.get_stations_cached(integration, base_url, auth_config)
+        if response and response.stations:
+            logger.info("Found %d stations for integration %s", len(response.stations), integration.id)
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_TRIGGERS)
+            results = await asyncio.gather(
+                *[_trigger_pull_station_conditions(integration, station, semaphore) for station in response.stations],
+                return_exceptions=True
+            )
             stations_triggered = 0
-            for station in response.stations:
-                logger.info(f"Triggering 'action_pull_station_conditions' action for station {station.Station_ID} to extract observations...")
-
-                parsed_config = PullStationConditionsConfig(
-                    station=station
-                )
-                await trigger_action(integration.id, "pull_station_conditions", config=parsed_config)
-                stations_triggered += 1
+            for station, result in zip(response.stations, results):
+                if isinstance(result, Exception):
+                    logger.error("Failed to trigger 'action_pull_station_conditions' for station %s. Exception: %s", station.Station_ID, result)
+                else:
+                    stations_triggered += 1
             return {"stations_triggered": stations_triggered}
         else:
-            logger.warning(f"No stations found for integration {integration.id}")
+            logger.warning("No stations found for integration %s", integration.id)
             return {"stations_triggered": 0}
     except (client.VWUnauthorizedException, client.VWNotFoundException, client.VWException) as e:
-        message = f"Failed to authenticate with integration {integration.id} using {auth_config}. Exception: {e}"
-        logger.exception(message)
+        logger.exception("Failed to authenticate with integration %s using %s. Exception: %s", integration.id, auth_config, e)
         raise e
     except httpx.HTTPStatusError as e:
-        message = f"'pull_observations' action error with integration {integration.id} using {auth_config}. Exception: {e}"
-        logger.exception(message)
+        logger.exception("'pull_observations' action error with integration %s using %s. Exception: %s", integration.id, auth_config, e)
         raise e
 
 
+def _raise_first_failure(tasks):
+    for task in tasks:
+        if task.done() and not task.cancelled() and task.exception() is not None:
+            raise task.exception()
+
+
+async def _stream_send(records, send, batch_size, record_type, station_id, semaphore=None):
+    # Batch the records lazily and keep up to MAX_CONCURRENT_SENDS batches in flight while the next ones are built.
+    # Acquiring before building each task bounds both the in-flight requests and the batches held in memory.
+    # Callers streaming several stations at once pass a shared semaphore so the limit applies to all of them.
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_SENDS)
+    sends = []
+    try:
+        for i, batch in enumerate(generate_batches(records, batch_size)):
+            # Stop at the first failed send instead of building and sending the remaining batches
+            _raise_first_failure(sends)
+            await semaphore.acquire()
+            _raise_first_failure(sends)
+            logger.info("Sending %s batch #%d: %d %s. station: %s", record_type, i, len(batch), record_type, station_id)
+            task = asyncio.create_task(send(batch))
+            # Released on completion, even for a task cancelled before it started, so a shared slot is never lost
+            task.add_done_callback(lambda _: semaphore.release())
+            sends.append(task)
+            # Let the send start its request before this coroutine resumes building the next batch
+            await asyncio.sleep(0)
+        responses = await asyncio.gather(*sends)
+    finally:
+        # On failure, don't leave sends running in the background or their errors unretrieved
+        for task in sends:
+            task.cancel()
+        await asyncio.gather(*sends, return_exceptions=True)
+    return sum(len(response) for response in responses)
+
+
 @activity_logger()
 async def action_pull_station_conditions(integration, action_config: PullStationConditionsConfig):
-    logger.info(f"Executing action 'pull_station_conditions' for integration ID {integration.id} and action_config {action_config}...")
+    logger.info("Executing action 'pull_station_conditions' for integration ID %s and action_config %s...", integration.id, action_config)
 
     base_url = integration.base_url or VW_BASE_URL
     auth_config = get_auth_config(integration)
-    observations_extracted = 0
 
     try:
         conditions_response = await client.get_station_conditions(integration, base_url, action_config, auth_config)
-        if conditions_response:
-            logger.info(f"Extracted {len(conditions_response.conditions)} observations for station {action_config.station.Station_ID}.")
+        if conditions_response and conditions_response.conditions:
+            logger.info("Extracted %d observations for station %s.", len(conditions_response.conditions), action_config.station.Station_ID)
             transformed_data = transform(action_config.station, conditions_response)
 
-            for i, batch in enumerate(generate_batches(list(transformed_data), 200)):
-                logger.info(f'Sending observations batch #{i}: {len(batch)} observations. station: {action_config.station.Station_ID}')
-                response = await send_observations_to_gundi(observations=batch, integration_id=integration.id)
-                observations_extracted += len(response)
+            observations_extracted = await _stream_send(
+                transformed_data,
+                lambda batch: send_observations_to_gundi(observations=batch, integration_id=integration.id),
+                settings.OBSERVATION_BATCH_SIZE,
+                "observations",
+                action_config.station.Station_ID
+            )
 
             return {"observations_extracted": observations_extracted}
         else:
-            logger.warning(f"No observations found for station {action_config.station.Station_ID}")
+            logger.warning("No observations found for station %s", action_config.station.Station_ID)
             return {"observations_extracted": 0}
     except client.VWUnauthorizedException as e:
-        message = f"Failed to authenticate with integration {integration.id} using {action_config}. Exception: {e}"
-        logger.exception(message)
+        logger.exception("Failed to authenticate with integration %s using %s. Exception: %s", integration.id, action_config, e)
         raise e
     except client.VWNotFoundException as e:
-        message = f"Not found response with integration {integration.id} using {action_config}. Exception: {e}"
-        logger.exception(message)
+        logger.exception("Not found response with integration %s using %s. Exception: %s", integration.id, action_config, e)
         raise e
 
 
+async def _process_station_summary(integration, base_url, auth_config, station, validators, semaphore, send_semaphore):
+    async with semaphore:
+        daily_summary = await client.get_daily_summary(integration, base_url, station, auth_config, validators=validators)
+    if not daily_summary or not daily_summary.dailysummary:
+        return 0
+    # Stream the events of every summary of the station into the same batches instead of one batch per summary
+    transformed_data = _transform_daily_summaries(daily_summary, station)
+    try:
+        return await _stream_send(
+            transformed_data,
+            lambda batch: send_events_to_gundi(events=batch, integration_id=integration.id),
+            settings.EVENT_BATCH_SIZE,
+            "events",
+            station.Station_ID,
+            semaphore=send_semaphore
+        )
+    except Exception:
+        # A 304 on the next pull would otherwise skip the summaries that didn't make it to Gundi
+        await client.forget_daily_summary_validators(integration, station)
+        raise
+
+
 @activity_logger()
 @crontab_schedule("0 1 * * *")
 async def action_fetch_daily_summary(integration, action_config: FetchDailySummaryConfig):
-    logger.info(f"Executing 'fetch_daily_summary' action with integration ID {integration.id} and action_config {action_config}...")
+    logger.info("Executing 'fetch_daily_summary' action with integration ID %s and action_config %s...", integration.id, action_config)
 
     base_url = integration.base_url or VW_BASE_URL
     auth_config = get_auth_config(integration)
@@ -168,27 +268,33 @@ async def action_fetch_daily_summary(integration, action_config: FetchDailySumma
     summaries_fetched = 0
 
     try:
-        stations = await client.get_stations(integration, base_url, auth_config)
-        if stations:
-            logger.info(f"Found {len(stations.stations)} stations for integration {integration.id}")
-            for station in stations.stations:
-                daily_summary = await client.get_daily_summary(integration, base_url, station, auth_config)
-                if daily_summary:
-                    for station_summary in daily_summary.dailysummary:
-                        logger.info(f"Sending daily summary for station {station_summary.station_id} Date: {station_summary.Date}.")
-                        transformed_data = transform_daily_summary(station_summary, daily_summary.units, station)
-
-                        for i, batch in enumerate(generate_batches(list(transformed_data), 200)):
-                            logger.info(f'Sending events batch #{i}: {len(batch)} events. station: {station_summary.station_id}')
-                            response = await send_events_to_gundi(events=batch, integration_id=integration.id)
-                            summaries_fetched += len(response)
+        stations = await client.get_stations_cached(integration, base_url, auth_config)
+        if stations and stations.stations:
+            logger.info("Found %d stations for integration %s", len(stations.stations), integration.id)
+            validators = await client.get_daily_summary_validators(integration, stations.stations)
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_SUMMARY_REQUESTS)
+            # Shared by every station, so Gundi sees at most MAX_CONCURRENT_SENDS requests from this action
+            send_semaphore = asyncio.Semaphore(MAX_CONCURRENT_SENDS)
+            results = await asyncio.gather(
+                *[
+                    _process_station_summary(
+                        integration, base_url, auth_config, station, validators.get(str(station.Station_ID)),
+                        semaphore, send_semaphore
+                    )
+                    for station in stations.stations
+                ],
+                return_exceptions=True
+            )
+            # Every station gets its chance before the first error (if any) fails the action
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+            summaries_fetched = sum(results)
 
         return {"summaries_fetched": summaries_fetched}
     except (client.VWUnauthorizedException, client.VWNotFoundException, client.VWException) as e:
-        message = f"Failed to authenticate with integration {integration.id} using {auth_config}. Exception: {e}"
-        logger.exception(message)
+        logger.exception("Failed to authenticate with integration %s using %s. Exception: %s", integration.id, auth_config, e)
         raise e
     except httpx.HTTPStatusError as e:
-        message = f"'fetch_daily_summary' action error with integration {integration.id} using {auth_config}. Exception: {e}"
-        logger.exception(message)
+        logger.exception("'fetch_daily_summary' action error with integration %s using %s. Exception: %s", integration.id, auth_config, e)
         raise e
@@ -0,0 +1,436 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+import respx
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+from app import settings
+from app.actions import client
+from app.actions.client import (
+    _endpoint_url,
+    get_client,
+    aclose_client,
+    get_stations,
+    get_stations_cached,
+    get_station_conditions,
+    get_daily_summary,
+    StationsResponse,
+    ConditionsResponse,
+    DailySummaryResponse,
+    Station,
+    VWException,
+    VWUnauthorizedException
+)
+from app.actions.configurations import AuthenticateConfig, PullStationConditionsConfig
+
+
+BASE_URL = "https://test.vitalweather.co.za/api/v1"
+
+
+@pytest.fixture
+def stations_payload():
+    return {
+        "stations": [
+            {
+                "Station_ID": 123,
+                "Station_Name": "Test Station",
+                "latitude": -15.92883055,
+                "longitude": 34.606880555,
+                "height": 166.6
+            }
+        ],
+        "generated_at": 1739811533,
+        "code": 200,
+        "message": "success"
+    }
+
+
+@pytest.fixture
+def conditions_payload():
+    return {
+        "conditions": [
+            {
+                "station_id": 123,
+                "station_Name": "Test Station",
+                "ts": "2025-03-06 14:35:02",
+                "pressure": 995.3,
+                "temperature": 25.6,
+                "humidity": 88,
+                "wind_average": 0.0,
+                "max_wind": 3.2,
+                "wind_direction": 180,
+                "total_rain": 0.0,
+                "FDI": 1,
+                "solar_radiation": 0.0
+            }
+        ],
+        "unites": {
+            "local_time_last_update": "SAST",
+            "ts": "UTC",
+            "temperature": "°C",
+            "humidity": "%",
+            "pressure": "mb",
+            "wind_average": "Kp/h",
+            "wind_direction": "360 points",
+            "total_rain": "mm",
+            "solar_radiation": " W/M2",
+            "FDI": "index"
+        },
+        "generated_at": 1739811533,
+        "code": 200,
+        "message": "success"
+    }
+
+
+@pytest.fixture
+def daily_summary_payload():
+    return {
+        "dailysummary": [
+            {
+                "station_id": 123,
+                "Date": "2025-03-03",
+                "rain": 58.8,
+                "avg_temp": 21.6,
+                "min_temp": 20.6,
+                "max_temp": 22.8,
+                "avg_RH": 94,
+                "min_RH": 92,
+                "max_RH": 95,
+                "avg_wind": 0.1,
+                "avg_solar": 0,
+                "avg_pressure": 1003.71,
+                "min_pressure": 1002.51,
+                "max_pressure": 1005.28,
+                "avg_winddirection": [225, "SW"]
+            }
+        ],
+        "unites": {
+            "rain": "mm",
+            "avg_temp": "°C",
+            "max_temp": "°C",
+            "min_temp": "°C",
+            "avg_RH": "%",
+            "max_hum": "%",
+            "min_hum": "%",
+            "avg_wind": "kph",
+            "avg_solar": "Watts/M",
+            "avg_pressure": "mb",
+            "min_pressure": "mb",
+            "max_pressure": "mb",
+            "avg_winddirection": ["°", "DIR"]
+        },
+        "generated_at": 1747242490,
+        "code": 200,
+        "message": "success"
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_client_is_reused_within_a_loop():
+    session = await get_client()
+
+    assert await get_client() is session
+    assert not session.is_closed
+    await aclose_client()
+
+
+def test_get_client_creates_a_client_per_loop():
+    async def get_session():
+        session = await get_client()
+        return session, len(client._clients)
+
+    sessions = []
+    for _ in range(4):
+        session, registered_clients = asyncio.run(get_session())
+        sessions.append(session)
+        # Clients of loops that already finished are not kept around
+        assert registered_clients == 1
+
+    assert len({id(session) for session in sessions}) == 4
+
+
+@pytest.mark.asyncio
+async def test_aclose_client_closes_and_forgets_the_client():
+    session = await get_client()
+
+    await aclose_client()
+
+    assert session.is_closed
+    assert client._clients.get() is None
+    new_session = await get_client()
+    assert new_session is not session
+    await aclose_client()
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_stations_success(mocker, stations_payload):
+    mocker.patch("app.services.state.IntegrationStateManager.get_state", return_value={})
+    mocker.patch("app.services.state.IntegrationStateManager.set_state", new=AsyncMock())
+    respx.get(f"{BASE_URL}/stations.php").mock(return_value=httpx.Response(200, json=stations_payload))
+
+    response = await get_stations(mocker.Mock(id="test-integration"), BASE_URL, AuthenticateConfig(key="testkey"))
+
+    assert isinstance(response, StationsResponse)
+    assert response.stations[0].Station_ID == 123
+    assert response.generated_at.tzinfo is not None
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_stations_error_code(mocker, stations_payload):
+    mocker.patch("app.services.state.IntegrationStateManager.get_state", return_value={})
+    respx.get(f"{BASE_URL}/stations.php").mock(
+        return_value=httpx.Response(200, json={"code": 400, "message": "Incorrect KEY"})
+    )
+
+    with pytest.raises(VWException, match="Incorrect KEY"):
+        await get_stations(mocker.Mock(id="test-integration"), BASE_URL, AuthenticateConfig(key="testkey"))
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_stations_unauthorized_is_not_retried(mocker):
+    mock_get_state = mocker.patch("app.services.state.IntegrationStateManager.get_state", return_value={})
+    route = respx.get(f"{BASE_URL}/stations.php").mock(return_value=httpx.Response(401, text="Unauthorized"))
+
+    with pytest.raises(VWUnauthorizedException):
+        await get_stations(mocker.Mock(id="test-integration"), BASE_URL, AuthenticateConfig(key="testkey"))
+
+    assert route.call_count == 1
+    mock_get_state.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_stations_retries_server_error_without_blocking(mocker, stations_payload):
+    mocker.patch("app.services.state.IntegrationStateManager.get_state", return_value={})
+    mocker.patch("app.services.state.IntegrationStateManager.set_state", new=AsyncMock())
+    mock_time_sleep = mocker.patch("time.sleep")
+    mock_asyncio_sleep = mocker.patch("asyncio.sleep", new=AsyncMock())
+    route = respx.get(f"{BASE_URL}/stations.php").mock(side_effect=[
+        httpx.Response(503, text="Service Unavailable"),
+        httpx.Response(200, json=stations_payload)
+    ])
+
+    response = await get_stations(mocker.Mock(id="test-integration"), BASE_URL, AuthenticateConfig(key="testkey"))
+
+    assert response.stations[0].Station_ID == 123
+    assert route.call_count == 2
+    mock_time_sleep.assert_not_called()
+    mock_asyncio_sleep.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_stations_stores_etag(mocker, stations_payload):
+    mocker.patch("app.services.state.IntegrationStateManager.get_state", return_value={})
+    mock_set_state = mocker.patch("app.services.state.IntegrationStateManager.set_state", new=AsyncMock())
+    respx.get(f"{BASE_URL}/stations.php").mock(
+        return_value=httpx.Response(200, json=stations_payload, headers={"ETag": '"abc123"'})
+    )
+
+    await get_stations(mocker.Mock(id="test-integration"), BASE_URL, AuthenticateConfig(key="testkey"))
+
+    mock_set_state.assert_awaited_once()
+    integration_id, action_id, state = mock_set_state.call_args.args
+    assert action_id == "stations_etag"
+    assert mock_set_state.call_args.kwargs["source_id"] == BASE_URL
+    assert state["etag"] == '"abc123"'
+    assert json.loads(state["body"]) == stations_payload
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_stations_not_modified_uses_stored_body(mocker, stations_payload):
+    mocker.patch("app.services.state.IntegrationStateManager.get_state", return_value={
+        "etag": '"abc123"',
+        "last_modified": None,
+        "body": json.dumps(stations_payload)
+    })
+    mock_set_state = mocker.patch("app.services.state.IntegrationStateManager.set_state", new=AsyncMock())
+    route = respx.get(f"{BASE_URL}/stations.php").mock(return_value=httpx.Response(304))
+
+    response = await get_stations(mocker.Mock(id="test-integration"), BASE_URL, AuthenticateConfig(key="testkey"))
+
+    assert route.calls.last.request.headers["If-None-Match"] == '"abc123"'
+    assert response.stations[0].Station_ID == 123
+    mock_set_state.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_stations_not_modified_without_stored_body_downloads_again(mocker, stations_payload):
+    mocker.patch("app.services.state.IntegrationStateManager.get_state", return_value={
+        "etag": '"abc123"',
+        "last_modified": None
+    })
+    mocker.patch("app.services.state.IntegrationStateManager.set_state", new=AsyncMock())
+    route = respx.get(f"{BASE_URL}/stations.php").mock(side_effect=[
+        httpx.Response(304),
+        httpx.Response(200, json=stations_payload)
+    ])
+
+    response = await get_stations(mocker.Mock(id="test-integration"), BASE_URL, AuthenticateConfig(key="testkey"))
+
+    assert response.stations[0].Station_ID == 123
+    assert route.call_count == 2
+    assert "If-None-Match" not in route.calls.last.request.headers
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_stations_unconditional_skips_state(mocker, stations_payload):
+    mock_get_state = mocker.patch("app.services.state.IntegrationStateManager.get_state")
+    mock_set_state = mocker.patch("app.services.state.IntegrationStateManager.set_state", new=AsyncMock())
+    route = respx.get(f"{BASE_URL}/stations.php").mock(
+        return_value=httpx.Response(200, json=stations_payload, headers={"ETag": '"abc123"'})
+    )
+
+    response = await get_stations(
+        mocker.Mock(id="test-integration"), BASE_URL, AuthenticateConfig(key="testkey"), conditional=False
+    )
+
+    assert response.stations[0].Station_ID == 123
+    assert "If-None-Match" not in route.calls.last.request.headers
+    mock_get_state.assert_not_called()
+    mock_set_state.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_daily_summary_stores_validators_without_body(mocker, stations_payload, daily_summary_payload):
+    mock_set_state = mocker.patch("app.services.state.IntegrationStateManager.set_state", new=AsyncMock())
+    respx.get(f"{BASE_URL}/dailysummary.php/123").mock(
+        return_value=httpx.Response(200, json=daily_summary_payload, headers={"ETag": '"def456"'})
+    )
+    station = Station.parse_obj(stations_payload["stations"][0])
+
+    response = await get_daily_summary(
+        mocker.Mock(id="test-integration"), BASE_URL, station, AuthenticateConfig(key="testkey"), validators={}
+    )
+
+    assert isinstance(response, DailySummaryResponse)
+    integration_id, action_id, state = mock_set_state.call_args.args
+    assert action_id == "daily_summary_etag"
+    assert mock_set_state.call_args.kwargs["source_id"] == "123"
+    assert state == {"etag": '"def456"', "last_modified": None}
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_daily_summary_not_modified_returns_nothing(mocker, stations_payload):
+    mock_set_state = mocker.patch("app.services.state.IntegrationStateManager.set_state", new=AsyncMock())
+    route = respx.get(f"{BASE_URL}/dailysummary.php/123").mock(return_value=httpx.Response(304))
+    station = Station.parse_obj(stations_payload["stations"][0])
+
+    response = await get_daily_summary(
+        mocker.Mock(id="test-integration"), BASE_URL, station, AuthenticateConfig(key="testkey"),
+        validators={"etag": '"def456"', "last_modified": None}
+    )
+
+    assert response is None
+    assert route.calls.last.request.headers["If-None-Match"] == '"def456"'
+    mock_set_state.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_station_conditions_success(mocker, stations_payload, conditions_payload):
+    respx.get(f"{BASE_URL}/conditions.php/123").mock(return_value=httpx.Response(200, json=conditions_payload))
+    config = PullStationConditionsConfig(station=stations_payload["stations"][0])
+
+    response = await get_station_conditions(
+        mocker.Mock(id="test-integration"), BASE_URL, config, AuthenticateConfig(key="testkey")
+    )
+
+    assert isinstance(response, ConditionsResponse)
+    assert response.conditions[0].humidity == 88
+    assert response.conditions[0].ts.tzinfo is not None
+    assert response.units.temperature == "°C"
+
+
+@pytest.mark.asyncio
+async def test_get_stations_cached_miss_stores_stations(mocker, stations_payload):
+    mocker.patch("app.services.state.IntegrationStateManager.get_state", return_value={})
+    mock_set_state = mocker.patch("app.services.state.IntegrationStateManager.set_state", new=AsyncMock())
+    mock_get_stations = mocker.patch(
+        "app.actions.client.get_stations",
+        new=AsyncMock(return_value=StationsResponse.parse_obj(stations_payload))
+    )
+
+    response = await get_stations_cached(mocker.Mock(id="test-integration"), BASE_URL, AuthenticateConfig(key="testkey"))
+
+    assert response.stations[0].Station_ID == 123
+    mock_get_stations.assert_awaited_once()
+    mock_set_state.assert_awaited_once()
+    assert mock_set_state.call_args.args[1] == "stations_cache"
+
+
+@pytest.mark.asyncio
+async def test_get_stations_cached_hit_skips_request(mocker, stations_payload):
+    mocker.patch("app.services.state.IntegrationStateManager.get_state", return_value={
+        "base_url": BASE_URL,
+        "fetched_at": datetime.now(timezone.utc).isoformat(),
+        "stations": stations_payload
+    })
+    mock_get_stations = mocker.patch("app.actions.client.get_stations", new=AsyncMock())
+
+    response = await get_stations_cached(mocker.Mock(id="test-integration"), BASE_URL, AuthenticateConfig(key="testkey"))
+
+    assert response.stations[0].Station_ID == 123
+    mock_get_stations.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_get_stations_cached_expired_refreshes(mocker, stations_payload):
+    mocker.patch.object(settings, "STATIONS_CACHE_TTL", 60)
+    mocker.patch("app.services.state.IntegrationStateManager.get_state", return_value={
+        "base_url": BASE_URL,
+        "fetched_at": (datetime.now(timezone.utc) - timedelta(minutes=5)).isoformat(),
+        "stations": stations_payload
+    })
+    mock_set_state = mocker.patch("app.services.state.IntegrationStateManager.set_state", new=AsyncMock())
+    mock_get_stations = mocker.patch(
+        "app.actions.client.get_stations",
+        new=AsyncMock(return_value=StationsResponse.parse_obj(stations_payload))
+    )
+
+    await get_stations_cached(mocker.Mock(id="test-integration"), BASE_URL, AuthenticateConfig(key="testkey"))
+
+    mock_get_stations.assert_awaited_once()
+    mock_set_state.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_get_stations_cached_serves_stale_stations_on_error(mocker, stations_payload):
+    mocker.patch("app.services.state.IntegrationStateManager.get_state", return_value={
+        "base_url": BASE_URL,
+        "fetched_at": (datetime.now(timezone.utc) - timedelta(days=1)).isoformat(),
+        "stations": stations_payload
+    })
+    mocker.patch("app.actions.client.get_stations", new=AsyncMock(side_effect=httpx.ConnectError("Connection refused")))
+
+    response = await get_stations_cached(mocker.Mock(id="test-integration"), BASE_URL, AuthenticateConfig(key="testkey"))
+
+    assert response.stations[0].Station_ID == 123
+
+
+@pytest.mark.asyncio
+async def test_get_stations_cached_raises_without_cache(mocker):
+    mocker.patch("app.services.state.IntegrationStateManager.get_state", return_value={})
+    mocker.patch("app.actions.client.get_stations", new=AsyncMock(side_effect=httpx.ConnectError("Connection refused")))
+
+    with pytest.raises(httpx.ConnectError):
+        await get_stations_cached(mocker.Mock(id="test-integration"), BASE_URL, AuthenticateConfig(key="testkey"))
+
+
+def test_endpoint_url_is_parsed_once():
+    url = _endpoint_url(BASE_URL, "conditions.php/123")
+
+    assert isinstance(url, httpx.URL)
+    assert str(url) == f"{BASE_URL}/conditions.php/123"
+    assert _endpoint_url(BASE_URL, "conditions.php/123") is url
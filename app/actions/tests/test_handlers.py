@@ -1,13 +1,18 @@
+import asyncio
+import httpx
 import pytest
 
 from app import settings
 from unittest.mock import AsyncMock
-from datetime import datetime
+from datetime import datetime, timezone
 from app.actions.handlers import (
     action_auth,
     action_pull_observations,
     action_pull_station_conditions,
-    action_fetch_daily_summary
+    action_fetch_daily_summary,
+    transform,
+    transform_daily_summary,
+    _stream_send
 )
 from app.actions.configurations import (
     AuthenticateConfig,
@@ -15,7 +20,22 @@ from app.actions.configurations import (
     PullStationConditionsConfig,
     FetchDailySummaryConfig
 )
-from app.actions.client import VWException, Station, StationsResponse, DailySummaryResponse
+from app.actions.client import VWException, Station, StationsResponse, ConditionsResponse, DailySummaryResponse
+
+
+@pytest.fixture
+def mock_system_events(mocker, mock_publish_event):
+    mocker.patch("app.services.activity_logger.publish_event", mock_publish_event)
+    mocker.patch("app.services.action_runner.publish_event", mock_publish_event)
+    mocker.patch("app.services.action_scheduler.publish_event", mock_publish_event)
+    return mock_publish_event
+
+
+@pytest.fixture
+def mock_state_manager(mocker):
+    mocker.patch("app.services.state.IntegrationStateManager.get_state", return_value=None)
+    mocker.patch("app.services.state.IntegrationStateManager.get_states_bulk", return_value={})
+    mocker.patch("app.services.state.IntegrationStateManager.set_state", new=AsyncMock())
 
 
 @pytest.mark.asyncio
@@ -25,10 +45,11 @@ async def test_action_auth_success(mocker):
     mock_response = mocker.Mock()
     mock_response.stations = [mocker.Mock()]
 
-    mocker.patch('app.actions.client.get_stations', new=AsyncMock(return_value=mock_response))
+    mock_get_stations = mocker.patch('app.actions.client.get_stations', new=AsyncMock(return_value=mock_response))
 
     result = await action_auth(mock_integration, mock_action_config)
     assert result == {"valid_credentials": True}
+    assert mock_get_stations.call_args.kwargs["conditional"] is False
 
 @pytest.mark.asyncio
 async def test_action_auth_error(mocker):
@@ -45,17 +66,12 @@ async def test_action_auth_error(mocker):
     assert result == {"valid_credentials": False, "status_code": 400, "message": "Incorrect KEY"}
 
 @pytest.mark.asyncio
-async def test_action_pull_observations_triggers_pull_station_conditions(mocker, integration_v2, mock_publish_event):
+async def test_action_pull_observations_triggers_pull_station_conditions(mocker, integration_v2, mock_system_events, mock_state_manager):
     settings.TRIGGER_ACTIONS_ALWAYS_SYNC = False
     settings.INTEGRATION_COMMANDS_TOPIC = "vitalweather-actions-topic"
 
-    mocker.patch("app.services.state.IntegrationStateManager.get_state", return_value=None)
-    mocker.patch("app.services.activity_logger.publish_event", mock_publish_event)
-    mocker.patch("app.services.action_runner.publish_event", mock_publish_event)
-
     mock_trigger_action = mocker.patch("app.actions.handlers.trigger_action", return_value=None)
 
-    mocker.patch("app.services.action_scheduler.publish_event", mock_publish_event)
     mocker.patch("app.services.action_runner.execute_action", return_value=None)
 
     mocker.patch('app.actions.client.get_stations', new=AsyncMock(return_value=StationsResponse.parse_obj(
@@ -88,16 +104,84 @@ async def test_action_pull_observations_triggers_pull_station_conditions(mocker,
     mock_trigger_action.assert_called_once()
 
 @pytest.mark.asyncio
-async def test_action_pull_observations_error(mocker, integration_v2, mock_publish_event):
+async def test_action_pull_observations_triggers_one_action_per_station(mocker, integration_v2, mock_system_events, mock_state_manager):
+    mock_trigger_action = mocker.patch("app.actions.handlers.trigger_action", return_value=None)
+
+    mocker.patch('app.actions.client.get_stations', new=AsyncMock(return_value=StationsResponse.parse_obj(
+        {
+            "stations": [
+                {
+                    "Station_ID": station_id,
+                    "Station_Name": f"Test Station {station_id}",
+                    "latitude": -15.92883055,
+                    "longitude": 34.606880555,
+                    "height": 166.6
+                }
+                for station_id in (123, 456, 789)
+            ],
+            "generated_at": 1739811533,
+            "code": 200,
+            "message": "success"
+        }
+    )))
+
+    integration = integration_v2
+
+    # Modify auth config
+    integration.configurations[2].data = {"key": "testkey"}
+
+    action_config = PullObservationsConfig(default_lookback_days=15)
+
+    result = await action_pull_observations(integration, action_config)
+    assert result == {"stations_triggered": 3}
+
+    assert mock_trigger_action.call_count == 3
+    triggered_stations = {call.kwargs["config"].station.Station_ID for call in mock_trigger_action.call_args_list}
+    assert triggered_stations == {123, 456, 789}
+
+@pytest.mark.asyncio
+async def test_action_pull_observations_skips_failed_triggers(mocker, integration_v2, mock_system_events, mock_state_manager):
+    async def trigger_action(integration_id, action_id, config):
+        if config.station.Station_ID == 456:
+            raise Exception("PubSub unavailable")
+
+    mocker.patch("app.actions.handlers.trigger_action", new=trigger_action)
+
+    mocker.patch('app.actions.client.get_stations', new=AsyncMock(return_value=StationsResponse.parse_obj(
+        {
+            "stations": [
+                {
+                    "Station_ID": station_id,
+                    "Station_Name": f"Test Station {station_id}",
+                    "latitude": -15.92883055,
+                    "longitude": 34.606880555,
+                    "height": 166.6
+                }
+                for station_id in (123, 456, 789)
+            ],
+            "generated_at": 1739811533,
+            "code": 200,
+            "message": "success"
+        }
+    )))
+
+    integration = integration_v2
+
+    # Modify auth config
+    integration.configurations[2].data = {"key": "testkey"}
+
+    action_config = PullObservationsConfig(default_lookback_days=15)
+
+    result = await action_pull_observations(integration, action_config)
+    assert result == {"stations_triggered": 2}
+
+@pytest.mark.asyncio
+async def test_action_pull_observations_error(mocker, integration_v2, mock_system_events, mock_state_manager):
     mocker.patch('app.actions.client.get_stations', new=AsyncMock(side_effect=VWException(
         error=Exception("Incorrect KEY"),
         message="Incorrect KEY",
         status_code=400
     )))
-    mocker.patch("app.services.state.IntegrationStateManager.get_state", return_value=None)
-    mocker.patch("app.services.activity_logger.publish_event", mock_publish_event)
-    mocker.patch("app.services.action_runner.publish_event", mock_publish_event)
-    mocker.patch("app.services.action_scheduler.publish_event", mock_publish_event)
 
     integration = integration_v2
 
@@ -110,7 +194,7 @@ async def test_action_pull_observations_error(mocker, integration_v2, mock_publi
         await action_pull_observations(integration, action_config)
 
 @pytest.mark.asyncio
-async def test_action_pull_station_conditions_success(mocker, integration_v2, mock_publish_event):
+async def test_action_pull_station_conditions_success(mocker, integration_v2, mock_system_events, mock_state_manager):
     action_config = PullStationConditionsConfig(
         station=Station(
             Station_ID=123,
@@ -128,12 +212,7 @@ async def test_action_pull_station_conditions_success(mocker, integration_v2, mo
     # Modify auth config
     integration.configurations[2].data = {"key": "testkey"}
 
-    mocker.patch("app.services.state.IntegrationStateManager.get_state", return_value=None)
-    mocker.patch("app.services.activity_logger.publish_event", mock_publish_event)
-    mocker.patch("app.services.action_runner.publish_event", mock_publish_event)
-    mocker.patch("app.services.action_scheduler.publish_event", mock_publish_event)
     mocker.patch('app.actions.client.get_station_conditions', new=AsyncMock(return_value=mock_conditions_response))
-    mocker.patch('app.services.state.IntegrationStateManager.set_state', new=AsyncMock())
     mocker.patch('app.services.utils.generate_batches', return_value=[[{}]])
     mocker.patch('app.actions.handlers.send_observations_to_gundi', new=AsyncMock(return_value=[{}]))
     mocker.patch('app.actions.handlers.transform', return_value=[{
@@ -162,7 +241,122 @@ async def test_action_pull_station_conditions_success(mocker, integration_v2, mo
     assert result == {"observations_extracted": 1}
 
 @pytest.mark.asyncio
-async def test_action_pull_station_conditions_error(mocker, integration_v2, mock_publish_event):
+async def test_action_pull_station_conditions_sends_all_batches(mocker, integration_v2, mock_system_events, mock_state_manager):
+    mocker.patch.object(settings, "OBSERVATION_BATCH_SIZE", 200)
+    action_config = PullStationConditionsConfig(
+        station=Station(
+            Station_ID=123,
+            Station_Name="Test Station",
+            latitude=-15.92883055,
+            longitude=34.606880555,
+            height=166.6
+        )
+    )
+
+    integration = integration_v2
+
+    # Modify auth config
+    integration.configurations[2].data = {"key": "testkey"}
+
+    mocker.patch('app.actions.client.get_station_conditions', new=AsyncMock(return_value=mocker.Mock(conditions=[mocker.Mock()])))
+    mocker.patch('app.actions.handlers.transform', return_value=({"source": 123, "index": i} for i in range(450)))
+    mock_send_observations = mocker.patch(
+        'app.actions.handlers.send_observations_to_gundi',
+        new=AsyncMock(side_effect=lambda observations, **kwargs: [{}] * len(observations))
+    )
+
+    result = await action_pull_station_conditions(integration, action_config)
+
+    assert result == {"observations_extracted": 450}
+    assert [len(call.kwargs["observations"]) for call in mock_send_observations.call_args_list] == [200, 200, 50]
+
+@pytest.mark.asyncio
+async def test_action_pull_station_conditions_stops_after_failed_send(mocker, integration_v2, mock_system_events, mock_state_manager):
+    mocker.patch.object(settings, "OBSERVATION_BATCH_SIZE", 100)
+    action_config = PullStationConditionsConfig(
+        station=Station(
+            Station_ID=123,
+            Station_Name="Test Station",
+            latitude=-15.92883055,
+            longitude=34.606880555,
+            height=166.6
+        )
+    )
+
+    integration = integration_v2
+
+    # Modify auth config
+    integration.configurations[2].data = {"key": "testkey"}
+
+    mocker.patch('app.actions.client.get_station_conditions', new=AsyncMock(return_value=mocker.Mock(conditions=[mocker.Mock()])))
+    mocker.patch('app.actions.handlers.transform', return_value=({"source": 123, "index": i} for i in range(500)))
+
+    async def send_observations(observations, **kwargs):
+        if observations[0]["index"] == 0:
+            raise httpx.HTTPStatusError("Server Error", request=mocker.Mock(), response=mocker.Mock(status_code=500))
+        return [{}] * len(observations)
+
+    mock_send_observations = mocker.patch(
+        'app.actions.handlers.send_observations_to_gundi',
+        new=AsyncMock(side_effect=send_observations)
+    )
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await action_pull_station_conditions(integration, action_config)
+
+    assert mock_send_observations.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_send_cancels_pending_sends_on_failure():
+    pending_send_cancelled = asyncio.Event()
+
+    async def send(batch):
+        if batch[0] == 0:
+            # Give the next batch time to be sent before failing
+            await asyncio.sleep(0.01)
+            raise ValueError("Send failed")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            pending_send_cancelled.set()
+            raise
+
+    with pytest.raises(ValueError):
+        await _stream_send(iter(range(2)), send, 1, "observations", 123)
+
+    assert pending_send_cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_action_pull_station_conditions_empty_response(mocker, integration_v2, mock_system_events, mock_state_manager):
+    action_config = PullStationConditionsConfig(
+        station=Station(
+            Station_ID=123,
+            Station_Name="Test Station",
+            latitude=-15.92883055,
+            longitude=34.606880555,
+            height=166.6
+        )
+    )
+
+    integration = integration_v2
+
+    # Modify auth config
+    integration.configurations[2].data = {"key": "testkey"}
+
+    mocker.patch('app.actions.client.get_station_conditions', new=AsyncMock(return_value=mocker.Mock(conditions=[])))
+    mock_transform = mocker.patch('app.actions.handlers.transform')
+    mock_send_observations = mocker.patch('app.actions.handlers.send_observations_to_gundi', new=AsyncMock())
+
+    result = await action_pull_station_conditions(integration, action_config)
+
+    assert result == {"observations_extracted": 0}
+    mock_transform.assert_not_called()
+    mock_send_observations.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_action_pull_station_conditions_error(mocker, integration_v2, mock_system_events, mock_state_manager):
     action_config = PullStationConditionsConfig(
         station=Station(
             Station_ID=123,
@@ -172,10 +366,6 @@ async def test_action_pull_station_conditions_error(mocker, integration_v2, mock
             height=166.6
         )
     )
-    mocker.patch("app.services.state.IntegrationStateManager.get_state", return_value=None)
-    mocker.patch("app.services.activity_logger.publish_event", mock_publish_event)
-    mocker.patch("app.services.action_runner.publish_event", mock_publish_event)
-    mocker.patch("app.services.action_scheduler.publish_event", mock_publish_event)
 
     integration = integration_v2
 
@@ -193,10 +383,7 @@ async def test_action_pull_station_conditions_error(mocker, integration_v2, mock
 
 
 @pytest.mark.asyncio
-async def test_action_fetch_daily_summary_success(mocker, integration_v2, mock_publish_event):
-    mocker.patch("app.services.activity_logger.publish_event", mock_publish_event)
-    mocker.patch("app.services.action_runner.publish_event", mock_publish_event)
-    mocker.patch("app.services.action_scheduler.publish_event", mock_publish_event)
+async def test_action_fetch_daily_summary_success(mocker, integration_v2, mock_system_events, mock_state_manager):
     mocker.patch('app.services.utils.generate_batches', return_value=[[{}]])
     mocker.patch('app.actions.handlers.send_events_to_gundi', new=AsyncMock(return_value=[{}]))
 
@@ -279,11 +466,172 @@ async def test_action_fetch_daily_summary_success(mocker, integration_v2, mock_p
 
 
 @pytest.mark.asyncio
-async def test_action_fetch_daily_summary_no_stations(mocker, integration_v2, mock_publish_event):
-    mocker.patch("app.services.activity_logger.publish_event", mock_publish_event)
-    mocker.patch("app.services.action_runner.publish_event", mock_publish_event)
-    mocker.patch("app.services.action_scheduler.publish_event", mock_publish_event)
+async def test_action_fetch_daily_summary_limits_sends_across_stations(mocker, integration_v2, mock_system_events, mock_state_manager):
+    mocker.patch("app.actions.handlers.MAX_CONCURRENT_SENDS", 2)
+    mocker.patch.object(settings, "EVENT_BATCH_SIZE", 1)
+    mocker.patch('app.actions.client.get_stations', new=AsyncMock(return_value=StationsResponse.parse_obj(
+        {
+            "stations": [
+                {
+                    "Station_ID": station_id,
+                    "Station_Name": f"Test Station {station_id}",
+                    "latitude": -15.92883055,
+                    "longitude": 34.606880555,
+                    "height": 166.6
+                }
+                for station_id in range(1, 6)
+            ],
+            "generated_at": 1739811533,
+            "code": 200,
+            "message": "success"
+        }
+    )))
+
+    async def get_daily_summary(integration, base_url, station, config, validators=None):
+        return DailySummaryResponse.parse_obj(
+            {
+                "dailysummary": [
+                    {
+                        "station_id": station.Station_ID,
+                        "Date": date,
+                        "rain": 58.8,
+                        "avg_temp": 21.6,
+                        "min_temp": 20.6,
+                        "max_temp": 22.8,
+                        "avg_RH": 94,
+                        "min_RH": 92,
+                        "max_RH": 95,
+                        "avg_wind": 0.1,
+                        "avg_solar": 0,
+                        "avg_pressure": 1003.71,
+                        "min_pressure": 1002.51,
+                        "max_pressure": 1005.28,
+                        "avg_winddirection": [225, "SW"]
+                    }
+                    for date in ("2025-03-02", "2025-03-03")
+                ],
+                "unites": {
+                    "rain": "mm",
+                    "avg_temp": "°C",
+                    "max_temp": "°C",
+                    "min_temp": "°C",
+                    "avg_RH": "%",
+                    "max_hum": "%",
+                    "min_hum": "%",
+                    "avg_wind": "kph",
+                    "avg_solar": "Watts/M",
+                    "avg_pressure": "mb",
+                    "min_pressure": "mb",
+                    "max_pressure": "mb",
+                    "avg_winddirection": ["°", "DIR"]
+                },
+                "generated_at": 1747242490,
+                "code": 200,
+                "message": "success"
+            }
+        )
+
+    mocker.patch("app.actions.client.get_daily_summary", new=get_daily_summary)
+
+    in_flight = 0
+    peak_in_flight = 0
+
+    async def send_events(events, **kwargs):
+        nonlocal in_flight, peak_in_flight
+        in_flight += 1
+        peak_in_flight = max(peak_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return [{}] * len(events)
+
+    mocker.patch("app.actions.handlers.send_events_to_gundi", new=AsyncMock(side_effect=send_events))
+
+    integration = integration_v2
+
+    # Modify auth config
+    integration.configurations[2].data = {"key": "testkey"}
+
+    result = await action_fetch_daily_summary(integration, FetchDailySummaryConfig())
 
+    assert result == {"summaries_fetched": 10}
+    assert peak_in_flight == 2
+
+
+@pytest.mark.asyncio
+async def test_action_fetch_daily_summary_forgets_validators_after_failed_send(mocker, integration_v2, mock_system_events, mock_state_manager):
+    mocker.patch('app.actions.client.get_stations', new=AsyncMock(return_value=StationsResponse.parse_obj(
+        {
+            "stations": [
+                {
+                    "Station_ID": 123,
+                    "Station_Name": "Test Station",
+                    "latitude": -15.92883055,
+                    "longitude": 34.606880555,
+                    "height": 166.6
+                }
+            ],
+            "generated_at": 1739811533,
+            "code": 200,
+            "message": "success"
+        }
+    )))
+    mocker.patch("app.actions.client.get_daily_summary", new=AsyncMock(return_value=DailySummaryResponse.parse_obj(
+        {
+            "dailysummary": [
+                {
+                    "station_id": 123,
+                    "Date": "2025-03-03",
+                    "rain": 58.8,
+                    "avg_temp": 21.6,
+                    "min_temp": 20.6,
+                    "max_temp": 22.8,
+                    "avg_RH": 94,
+                    "min_RH": 92,
+                    "max_RH": 95,
+                    "avg_wind": 0.1,
+                    "avg_solar": 0,
+                    "avg_pressure": 1003.71,
+                    "min_pressure": 1002.51,
+                    "max_pressure": 1005.28,
+                    "avg_winddirection": [225, "SW"]
+                }
+            ],
+            "unites": {
+                "rain": "mm",
+                "avg_temp": "°C",
+                "max_temp": "°C",
+                "min_temp": "°C",
+                "avg_RH": "%",
+                "max_hum": "%",
+                "min_hum": "%",
+                "avg_wind": "kph",
+                "avg_solar": "Watts/M",
+                "avg_pressure": "mb",
+                "min_pressure": "mb",
+                "max_pressure": "mb",
+                "avg_winddirection": ["°", "DIR"]
+            },
+            "generated_at": 1747242490,
+            "code": 200,
+            "message": "success"
+        }
+    )))
+    mocker.patch("app.actions.handlers.send_events_to_gundi", new=AsyncMock(side_effect=httpx.ConnectError("Connection refused")))
+    mock_delete_state = mocker.patch("app.services.state.IntegrationStateManager.delete_state", new=AsyncMock())
+
+    integration = integration_v2
+
+    # Modify auth config
+    integration.configurations[2].data = {"key": "testkey"}
+
+    with pytest.raises(httpx.ConnectError):
+        await action_fetch_daily_summary(integration, FetchDailySummaryConfig())
+
+    mock_delete_state.assert_awaited_once_with(str(integration.id), "daily_summary_etag", "123")
+
+
+@pytest.mark.asyncio
+async def test_action_fetch_daily_summary_no_stations(mocker, integration_v2, mock_system_events, mock_state_manager):
     mocker.patch('app.actions.client.get_stations', new=AsyncMock(return_value=None))
 
     integration = integration_v2
@@ -299,11 +647,7 @@ async def test_action_fetch_daily_summary_no_stations(mocker, integration_v2, mo
 
 
 @pytest.mark.asyncio
-async def test_action_fetch_daily_summary_error(mocker, integration_v2, mock_publish_event):
-    mocker.patch("app.services.activity_logger.publish_event", mock_publish_event)
-    mocker.patch("app.services.action_runner.publish_event", mock_publish_event)
-    mocker.patch("app.services.action_scheduler.publish_event", mock_publish_event)
-
+async def test_action_fetch_daily_summary_error(mocker, integration_v2, mock_system_events, mock_state_manager):
     mocker.patch('app.actions.client.get_stations', new=AsyncMock(side_effect=VWException(
         error=Exception("Incorrect KEY"),
         message="Incorrect KEY",
@@ -319,3 +663,150 @@ async def test_action_fetch_daily_summary_error(mocker, integration_v2, mock_pub
 
     with pytest.raises(Exception, match="'400: Incorrect KEY, Error: Incorrect KEY'"):
         await action_fetch_daily_summary(integration, action_config)
+
+
+def test_transform_appends_units():
+    station = Station(
+        Station_ID=123,
+        Station_Name="Test Station",
+        latitude=-15.92883055,
+        longitude=34.606880555,
+        height=166.6
+    )
+    observations = ConditionsResponse.parse_obj(
+        {
+            "conditions": [
+                {
+                    "station_id": 123,
+                    "station_Name": "Test Station",
+                    "ts": "2025-03-06 14:35:02",
+                    "pressure": 995.3,
+                    "temperature": 25.6,
+                    "humidity": 88,
+                    "wind_average": 0.0,
+                    "max_wind": 3.2,
+                    "wind_direction": 180,
+                    "total_rain": 0.0,
+                    "FDI": 1,
+                    "solar_radiation": 0.0
+                }
+            ],
+            "unites": {
+                "local_time_last_update": "SAST",
+                "ts": "UTC",
+                "temperature": "°C",
+                "humidity": "%",
+                "pressure": "mb",
+                "wind_average": "Kp/h",
+                "wind_direction": "360 points",
+                "total_rain": "mm",
+                "solar_radiation": " W/M2",
+                "FDI": "index"
+            },
+            "generated_at": 1739811533,
+            "code": 200,
+            "message": "success"
+        }
+    )
+
+    result = list(transform(station, observations))
+
+    assert result == [{
+        "source_name": "Test Station",
+        "source": 123,
+        "type": "stationary-object",
+        "subtype": "weather_station",
+        "recorded_at": "2025-03-06 14:35:02+00:00",
+        "location": {"lat": -15.92883055, "lon": 34.606880555},
+        "additional": {
+            "station_height": 166.6,
+            "station_id": 123,
+            "station_Name": "Test Station",
+            "pressure": "995.3 mb",
+            "temperature": "25.6 °C",
+            "humidity": "88 %",
+            "wind_average": "0.0 Kp/h",
+            "max_wind": 3.2,
+            "wind_direction": "180 360 points",
+            "total_rain": "0.0 mm",
+            "FDI": "1 index",
+            "solar_radiation": "0.0  W/M2"
+        }
+    }]
+
+
+def test_transform_daily_summary_appends_units():
+    station = Station(
+        Station_ID=123,
+        Station_Name="Test Station",
+        latitude=-15.92883055,
+        longitude=34.606880555,
+        height=166.6
+    )
+    daily_summary = DailySummaryResponse.parse_obj(
+        {
+            "dailysummary": [
+                {
+                    "station_id": 123,
+                    "Date": "2025-03-03",
+                    "rain": 58.8,
+                    "avg_temp": 21.6,
+                    "min_temp": 20.6,
+                    "max_temp": 22.8,
+                    "avg_RH": 94,
+                    "min_RH": 92,
+                    "max_RH": 95,
+                    "avg_wind": 0.1,
+                    "avg_solar": 0,
+                    "avg_pressure": 1003.71,
+                    "min_pressure": 1002.51,
+                    "max_pressure": 1005.28,
+                    "avg_winddirection": [225, "SW"]
+                }
+            ],
+            "unites": {
+                "rain": "mm",
+                "avg_temp": "°C",
+                "max_temp": "°C",
+                "min_temp": "°C",
+                "avg_RH": "%",
+                "max_hum": "%",
+                "min_hum": "%",
+                "avg_wind": "kph",
+                "avg_solar": "Watts/M",
+                "avg_pressure": "mb",
+                "min_pressure": "mb",
+                "max_pressure": "mb",
+                "avg_winddirection": ["°", "DIR"]
+            },
+            "generated_at": 1747242490,
+            "code": 200,
+            "message": "success"
+        }
+    )
+
+    result = list(transform_daily_summary(daily_summary.dailysummary[0], daily_summary.units, station))
+
+    assert result == [{
+        "title": "Station 123 Summary (2025-03-03)",
+        "event_type": "weather_station_summary",
+        "recorded_at": datetime(2025, 3, 3, tzinfo=timezone.utc),
+        "location": {"lat": -15.92883055, "lon": 34.606880555},
+        "event_details": {
+            "station_id": 123,
+            "Date": "2025-03-03",
+            "rain": "58.8 mm",
+            "avg_temp": "21.6 °C",
+            "min_temp": "20.6 °C",
+            "max_temp": "22.8 °C",
+            "avg_RH": "94 %",
+            "min_RH": 92,
+            "max_RH": 95,
+            "avg_wind": "0.1 kph",
+            "avg_solar": "0 Watts/M",
+            "avg_pressure": "1003.71 mb",
+            "min_pressure": "1002.51 mb",
+            "max_pressure": "1005.28 mb",
+            "avg_winddirection": "[225, 'SW'] ['°', 'DIR']"
+        }
+    }]
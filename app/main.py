@@ -13,6 +13,8 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.services.action_runner import execute_action, _portal
 from app.services.self_registration import register_integration_in_gundi
+from app.services.activity_logger import flush_events
+from app.actions.client import aclose_client
 
 
 # For running behind a proxy, we'll want to configure the root path for OpenAPI browser.
@@ -27,7 +29,9 @@ async def lifespan(app: FastAPI):
         # ToDo: set env var to false in GCP after registration
     yield
     # Shotdown Hook
+    await flush_events()
     await _portal.close()
+    await aclose_client()
 
 
 app = FastAPI(
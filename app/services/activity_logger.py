@@ -26,6 +26,7 @@ from gundi_core.events import (
     CustomWebhookLog,
 )
 from app import settings
+from app.services.utils import LoopLocal
 
 
 logger = logging.getLogger(__name__)
@@ -64,6 +65,126 @@ async def publish_event(event: SystemEventBaseModel, topic_name: str):
             return response
 
 
+# Publish several events to the same topic within one request
+@stamina.retry(
+    on=(aiohttp.ClientError, asyncio.TimeoutError),
+    attempts=5,
+    wait_initial=4.0,
+    wait_max=60,
+    wait_jitter=5.0
+)
+async def publish_events(events: list, topic_name: str):
+    timeout_settings = aiohttp.ClientTimeout(total=20.0)
+    async with aiohttp.ClientSession(
+        raise_for_status=True, timeout=timeout_settings
+    ) as session:
+        client = pubsub.PublisherClient(session=session)
+        topic = client.topic_path(settings.GCP_PROJECT_ID, topic_name)
+        messages = [
+            pubsub.PubsubMessage(json.dumps(event.dict(), default=str).encode("utf-8"))
+            for event in events
+        ]
+        logger.debug(f"Sending {len(messages)} events to PubSub topic {topic_name}..")
+        try:
+            response = await client.publish(topic, messages)
+        except Exception as e:
+            logger.exception(
+                f"Error publishing {len(messages)} system events to topic {topic_name}: {e}. This will be retried."
+            )
+            raise e
+        else:
+            logger.debug(f"{len(messages)} system events published successfully.")
+            return response
+
+
+class EventBuffer:
+    """
+    Collects system events in-process and publishes them in batches, flushing
+    when `max_size` events are queued or `max_wait` seconds have passed.
+    """
+    def __init__(self, max_size: int, max_wait: float):
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._queue = asyncio.Queue()
+        self._consumer = None
+
+    async def put(self, event: SystemEventBaseModel, topic_name: str):
+        await self._queue.put((event, topic_name))
+        if self._consumer is None or self._consumer.done():
+            self._consumer = asyncio.create_task(self._consume())
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _publish(self, batch):
+        events_by_topic = {}
+        for event, topic_name in batch:
+            events_by_topic.setdefault(topic_name, []).append(event)
+        results = await asyncio.gather(
+            *(publish_events(events, topic_name) for topic_name, events in events_by_topic.items()),
+            return_exceptions=True
+        )
+        for topic_name, result in zip(events_by_topic, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error publishing buffered system events to topic {topic_name}: {result}")
+
+    async def _consume(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._publish(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def flush(self):
+        # Wait until every queued event has been published, then stop the consumer
+        if self._consumer is not None and not self._consumer.done():
+            await self._queue.join()
+        if self._consumer is not None:
+            self._consumer.cancel()
+            self._consumer = None
+
+
+_event_buffers = LoopLocal()
+
+
+def _get_event_buffer():
+    # Queues and tasks are bound to the event loop that created them
+    buffer = _event_buffers.get()
+    if buffer is None:
+        buffer = EventBuffer(
+            max_size=settings.ACTIVITY_EVENTS_BATCH_SIZE,
+            max_wait=settings.ACTIVITY_EVENTS_FLUSH_INTERVAL
+        )
+        _event_buffers.set(buffer)
+    return buffer
+
+
+async def emit_event(event: SystemEventBaseModel, topic_name: str):
+    if settings.BATCH_ACTIVITY_EVENTS:
+        await _get_event_buffer().put(event, topic_name)
+    else:
+        await publish_event(event=event, topic_name=topic_name)
+
+
+async def flush_events():
+    buffer = _event_buffers.pop()
+    if buffer:
+        await buffer.flush()
+
+
 async def log_activity(integration_id: str, action_id: str, title: str, level="INFO", config_data: dict = None, data: dict = None):
     # Show a deprecation warning in favor of using either log_action_activity or log_webhook_activity
     logger.warning("log_activity is deprecated. Please use log_action_activity or log_webhook_activity instead.")
@@ -81,7 +202,7 @@ async def log_action_activity(integration_id: str, action_id: str, title: str, l
         :return: None
         """
     logger.debug(f"Logging custom activity: {title}. Integration: {integration_id}. Action: {action_id}.")
-    await publish_event(
+    await emit_event(
         event=IntegrationActionCustomLog(
             payload=CustomActivityLog(
                 integration_id=integration_id,
@@ -109,7 +230,7 @@ async def log_webhook_activity(
         :return: None
         """
     logger.debug(f"Logging custom activity: {title}. Integration: {integration_id}. Webhook: {webhook_id}.")
-    await publish_event(
+    await emit_event(
         event=IntegrationWebhookCustomLog(
             payload=CustomWebhookLog(
                 integration_id=integration_id,
@@ -134,7 +255,7 @@ def activity_logger(on_start=True, on_completion=True, on_error=True):
             action_config = kwargs.get("action_config")
             config_data = action_config.dict() if action_config else {} or {}
             if on_start:
-                await publish_event(
+                await emit_event(
                     event=IntegrationActionStarted(
                         payload=ActionExecutionStarted(
                             integration_id=integration_id,
@@ -148,7 +269,7 @@ def activity_logger(on_start=True, on_completion=True, on_error=True):
                 result = await func(*args, **kwargs)
             except Exception as e:
                 if on_error:
-                    await publish_event(
+                    await emit_event(
                         event=IntegrationActionFailed(
                             payload=ActionExecutionFailed(
                                 integration_id=integration_id,
@@ -162,7 +283,7 @@ def activity_logger(on_start=True, on_completion=True, on_error=True):
                 raise e
             else:
                 if on_completion:
-                    await publish_event(
+                    await emit_event(
                         event=IntegrationActionComplete(
                             payload=ActionExecutionComplete(
                                 integration_id=integration_id,
@@ -188,7 +309,7 @@ def webhook_activity_logger(on_start=True, on_completion=True, on_error=True):
             config_data = webhook_config.dict() if webhook_config else {} or {}
             webhook_id = str(integration.webhook_configuration.webhook.value) if integration and integration.webhook_configuration else "webhook"
             if on_start:
-                await publish_event(
+                await emit_event(
                     event=IntegrationWebhookStarted(
                         payload=WebhookExecutionStarted(
                             integration_id=integration_id,
@@ -202,7 +323,7 @@ def webhook_activity_logger(on_start=True, on_completion=True, on_error=True):
                 result = await func(*args, **kwargs)
             except Exception as e:
                 if on_error:
-                    await publish_event(
+                    await emit_event(
                         event=IntegrationWebhookFailed(
                             payload=WebhookExecutionFailed(
                                 integration_id=integration_id,
@@ -216,7 +337,7 @@ def webhook_activity_logger(on_start=True, on_completion=True, on_error=True):
                 raise e
             else:
                 if on_completion:
-                    await publish_event(
+                    await emit_event(
                         event=IntegrationWebhookComplete(
                             payload=WebhookExecutionComplete(
                                 integration_id=integration_id,
@@ -14,14 +14,27 @@ class IntegrationStateManager:
         self.db_client = redis.Redis(host=host, port=port, db=db)
 
     async def get_state(self, integration_id: str, action_id: str, source_id: str = "no-source") -> dict:
-        for attempt in stamina.retry_context(on=redis.RedisError, attempts=5, wait_initial=1.0, wait_max=30, wait_jitter=3.0):
+        async for attempt in stamina.retry_context(on=redis.RedisError, attempts=5, wait_initial=1.0, wait_max=30, wait_jitter=3.0):
             with attempt:
                 json_value = await self.db_client.get(f"integration_state.{integration_id}.{action_id}.{source_id}")
         value = json.loads(json_value) if json_value else {}
         return value
 
+    async def get_states_bulk(self, integration_id: str, action_id: str, source_ids: list) -> dict:
+        # Read the state of many sources in a single round-trip (MGET) instead of one GET per source
+        if not source_ids:
+            return {}
+        keys = [f"integration_state.{integration_id}.{action_id}.{source_id}" for source_id in source_ids]
+        async for attempt in stamina.retry_context(on=redis.RedisError, attempts=5, wait_initial=1.0, wait_max=30, wait_jitter=3.0):
+            with attempt:
+                json_values = await self.db_client.mget(keys)
+        return {
+            source_id: json.loads(json_value) if json_value else {}
+            for source_id, json_value in zip(source_ids, json_values)
+        }
+
     async def set_state(self, integration_id: str, action_id: str, state: dict, source_id: str = "no-source"):
-        for attempt in stamina.retry_context(on=redis.RedisError, attempts=5, wait_initial=1.0, wait_max=30, wait_jitter=3.0):
+        async for attempt in stamina.retry_context(on=redis.RedisError, attempts=5, wait_initial=1.0, wait_max=30, wait_jitter=3.0):
             with attempt:
                 await self.db_client.set(
                     f"integration_state.{integration_id}.{action_id}.{source_id}",
@@ -29,7 +42,7 @@ class IntegrationStateManager:
                 )
 
     async def delete_state(self, integration_id: str, action_id: str, source_id: str = "no-source"):
-        for attempt in stamina.retry_context(on=redis.RedisError, attempts=5, wait_initial=1.0, wait_max=30, wait_jitter=3.0):
+        async for attempt in stamina.retry_context(on=redis.RedisError, attempts=5, wait_initial=1.0, wait_max=30, wait_jitter=3.0):
             with attempt:
                 await self.db_client.delete(
                     f"integration_state.{integration_id}.{action_id}.{source_id}"
@@ -1,5 +1,7 @@
+import asyncio
+
 import pytest
-from unittest.mock import ANY
+from unittest.mock import ANY, AsyncMock
 from gundi_core.events import (
     LogLevel,
     IntegrationActionStarted,
@@ -11,7 +13,10 @@ from gundi_core.events import (
     IntegrationWebhookFailed
 )
 from app import settings
-from app.services.activity_logger import publish_event, activity_logger, webhook_activity_logger, log_activity
+from app.services import activity_logger as activity_logger_module
+from app.services.activity_logger import (
+    publish_event, publish_events, activity_logger, webhook_activity_logger, log_activity, flush_events
+)
 from app.webhooks import GenericJsonPayload, GenericJsonTransformConfig
 
 
@@ -160,6 +165,60 @@ async def test_activity_logger_decorator_on_error(
     assert isinstance(mock_publish_event.call_args_list[1].kwargs.get("event"), IntegrationActionFailed)
 
 
+@pytest.mark.asyncio
+async def test_publish_events_sends_one_request(
+        mocker, mock_pubsub_client, action_started_event, action_complete_event, gcp_pubsub_publish_response
+):
+    mocker.patch("app.services.activity_logger.pubsub", mock_pubsub_client)
+
+    response = await publish_events(
+        events=[action_started_event, action_complete_event],
+        topic_name=settings.INTEGRATION_EVENTS_TOPIC
+    )
+
+    assert response == gcp_pubsub_publish_response
+    assert mock_pubsub_client.PubsubMessage.call_count == 2
+    assert mock_pubsub_client.PublisherClient.return_value.publish.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_activity_logger_decorator_batches_events(
+        mocker, mock_publish_event, integration_v2, pull_observations_config
+):
+    mocker.patch.object(settings, "BATCH_ACTIVITY_EVENTS", True)
+    mocker.patch("app.services.activity_logger.publish_event", mock_publish_event)
+    mock_publish_events = mocker.patch("app.services.activity_logger.publish_events", new=AsyncMock())
+
+    @activity_logger()
+    async def action_pull_observations(integration, action_config):
+        return {"observations_extracted": 10}
+
+    await action_pull_observations(
+        integration=integration_v2,
+        action_config=pull_observations_config
+    )
+    await flush_events()
+
+    assert not mock_publish_event.called
+    mock_publish_events.assert_awaited_once()
+    events = mock_publish_events.call_args.args[0]
+    assert isinstance(events[0], IntegrationActionStarted)
+    assert isinstance(events[1], IntegrationActionComplete)
+
+
+def test_event_buffers_of_closed_loops_are_dropped(mocker, action_started_event):
+    mocker.patch.object(settings, "BATCH_ACTIVITY_EVENTS", True)
+    mocker.patch("app.services.activity_logger.publish_events", new=AsyncMock())
+
+    async def emit():
+        await activity_logger_module.emit_event(action_started_event, settings.INTEGRATION_EVENTS_TOPIC)
+        # Not flushed: asyncio.run cancels the pending consumer and closes the loop
+        return len(activity_logger_module._event_buffers)
+
+    for _ in range(4):
+        assert asyncio.run(emit()) == 1
+
+
 @pytest.mark.asyncio
 async def test_log_activity_with_debug_level(mocker, integration_v2, pull_observations_config, mock_publish_event):
     mocker.patch("app.services.activity_logger.publish_event", mock_publish_event)
@@ -2,6 +2,9 @@ import datetime
 import json
 
 import pytest
+import redis.asyncio as redis
+from unittest.mock import AsyncMock
+from app.conftest import async_return
 from app.services.state import IntegrationStateManager
 
 
@@ -150,3 +153,71 @@ async def test_delete_state_source_state(mocker, mock_redis, integration_v2, moc
     mock_redis.Redis.return_value.delete.assert_called_once_with(
         f"integration_state.{integration_id}.pull_observations.{source_id}"
     )
+
+
+@pytest.mark.asyncio
+async def test_get_states_bulk(mocker, mock_redis, integration_v2, mock_integration_state):
+    mocker.patch("app.services.state.redis", mock_redis)
+    mock_redis.Redis.return_value.mget.return_value = async_return(
+        [json.dumps(mock_integration_state, default=str), None]
+    )
+    state_manager = IntegrationStateManager()
+    integration_id = str(integration_v2.id)
+
+    states = await state_manager.get_states_bulk(
+        integration_id=integration_id,
+        action_id="pull_observations",
+        source_ids=["device-123", "device-456"]
+    )
+
+    assert states == {"device-123": mock_integration_state, "device-456": {}}
+    mock_redis.Redis.return_value.mget.assert_called_once_with([
+        f"integration_state.{integration_id}.pull_observations.device-123",
+        f"integration_state.{integration_id}.pull_observations.device-456",
+    ])
+
+
+@pytest.mark.asyncio
+async def test_get_states_bulk_retries_without_blocking(mocker, mock_redis, integration_v2, mock_integration_state):
+    mock_redis.RedisError = redis.RedisError
+    mocker.patch("app.services.state.redis", mock_redis)
+    mock_redis.Redis.return_value.mget = AsyncMock(side_effect=[
+        redis.ConnectionError("Connection refused"),
+        [json.dumps(mock_integration_state, default=str)]
+    ])
+    mock_time_sleep = mocker.patch("time.sleep")
+    mock_asyncio_sleep = mocker.patch("asyncio.sleep", new=AsyncMock())
+    state_manager = IntegrationStateManager()
+
+    states = await state_manager.get_states_bulk(
+        integration_id=str(integration_v2.id),
+        action_id="pull_observations",
+        source_ids=["device-123"]
+    )
+
+    assert states == {"device-123": mock_integration_state}
+    assert mock_redis.Redis.return_value.mget.await_count == 2
+    mock_time_sleep.assert_not_called()
+    mock_asyncio_sleep.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_get_state_retries_without_blocking(mocker, mock_redis, integration_v2, mock_integration_state):
+    mock_redis.RedisError = redis.RedisError
+    mocker.patch("app.services.state.redis", mock_redis)
+    mock_redis.Redis.return_value.get = AsyncMock(side_effect=[
+        redis.ConnectionError("Connection refused"),
+        json.dumps(mock_integration_state, default=str)
+    ])
+    mock_time_sleep = mocker.patch("time.sleep")
+    mock_asyncio_sleep = mocker.patch("asyncio.sleep", new=AsyncMock())
+    state_manager = IntegrationStateManager()
+
+    state = await state_manager.get_state(
+        integration_id=str(integration_v2.id),
+        action_id="pull_observations"
+    )
+
+    assert state == mock_integration_state
+    mock_time_sleep.assert_not_called()
+    mock_asyncio_sleep.assert_awaited_once()
@@ -0,0 +1,15 @@
+import pytest
+
+from app.services.utils import generate_batches
+
+
+def test_generate_batches_from_generator():
+    batches = list(generate_batches((i for i in range(5)), 2))
+
+    assert batches == [[0, 1], [2, 3], [4]]
+
+
+@pytest.mark.parametrize("batch_size", [0, -1])
+def test_generate_batches_rejects_non_positive_batch_size(batch_size):
+    with pytest.raises(ValueError):
+        list(generate_batches(range(5), batch_size))
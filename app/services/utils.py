@@ -1,5 +1,8 @@
+import asyncio
+import itertools
 import struct
 import typing
+import weakref
 from pydantic import create_model, BaseModel
 from pydantic.fields import Field, FieldInfo, Undefined, NoArgAnyCallable
 from typing import Any, Dict, Optional, Union, List, Annotated
@@ -375,5 +378,35 @@ class UISchemaModelMixin:
 
 
 def generate_batches(iterable, batch_size):
-    for i in range(0, len(iterable), batch_size):
-        yield iterable[i: i + batch_size]
+    # Works on any iterable (e.g. a generator) without materializing it, so only one batch is held at a time
+    if batch_size <= 0:
+        # islice would silently yield nothing, so a misconfigured batch size would send no data at all
+        raise ValueError(f"batch_size must be a positive integer, got {batch_size}")
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, batch_size)):
+        yield batch
+
+
+class LoopLocal:
+    """One value per event loop, for objects bound to the loop they were created on (clients, queues)"""
+    def __init__(self):
+        # Keyed by the loop object, not id(); closed loops are pruned since values may keep them alive
+        self._values = weakref.WeakKeyDictionary()
+
+    def _prune(self):
+        for loop in [loop for loop in self._values.keys() if loop.is_closed()]:
+            del self._values[loop]
+
+    def get(self):
+        self._prune()
+        return self._values.get(asyncio.get_running_loop())
+
+    def set(self, value):
+        self._prune()
+        self._values[asyncio.get_running_loop()] = value
+
+    def pop(self):
+        return self._values.pop(asyncio.get_running_loop(), None)
+
+    def __len__(self):
+        return len(self._values)
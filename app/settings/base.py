@@ -74,3 +74,7 @@ INTEGRATION_EVENTS_TOPIC = env.str("INTEGRATION_EVENTS_TOPIC", "integration-even
 default_commands_topic = f"{INTEGRATION_TYPE_SLUG}-actions-topic" if INTEGRATION_TYPE_SLUG else None
 INTEGRATION_COMMANDS_TOPIC = env.str("INTEGRATION_COMMANDS_TOPIC", default_commands_topic)
 TRIGGER_ACTIONS_ALWAYS_SYNC = env.bool("TRIGGER_ACTIONS_ALWAYS_SYNC", False)
+# Publish activity events in batches instead of one request per event
+BATCH_ACTIVITY_EVENTS = env.bool("BATCH_ACTIVITY_EVENTS", False)
+ACTIVITY_EVENTS_BATCH_SIZE = env.int("ACTIVITY_EVENTS_BATCH_SIZE", 100)
+ACTIVITY_EVENTS_FLUSH_INTERVAL = env.float("ACTIVITY_EVENTS_FLUSH_INTERVAL", 0.5)  # Seconds
@@ -1 +1,15 @@
 # Add your integration-specific settings here
+from environs import Env
+
+env = Env()
+env.read_env()
+
+# Batch sizes used when sending data to Gundi. Fewer, larger requests amortize per-request overhead.
+# To tune, measure throughput at 100, 200, 500, 1000 and 2000 and keep the smallest size past which
+# throughput stops improving (or Gundi starts rejecting/slowing down requests).
+OBSERVATION_BATCH_SIZE = env.int("OBSERVATION_BATCH_SIZE", 500)
+EVENT_BATCH_SIZE = env.int("EVENT_BATCH_SIZE", 500)
+
+# Seconds a cached station list is reused by scheduled pulls before asking the API again (0 always refreshes).
+# A stale list is still used as a fallback when the API is unreachable.
+STATIONS_CACHE_TTL = env.int("STATIONS_CACHE_TTL", 60 * 30)